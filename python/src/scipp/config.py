@@ -30,6 +30,15 @@ class _Plot:
         # The size threshold above which an image is automatically rasterized
         self.rasterize_threshold = 100000
 
+        # The number of points above which a 1D trace is downsampled before
+        # being sent to the front-end. Below this, sending all the points is
+        # as cheap as selecting the subset.
+        self.max_points_per_trace = 20000
+
+        # Update the slices while the sliders are being dragged. If False,
+        # slices are only updated when a slider is released.
+        self.continuous_update = False
+
 
 class _Colors:
 
@@ -6,7 +6,7 @@
 from ..config import plot as config
 from .render import render_plot
 from .slicer import Slicer
-from .tools import axis_label
+from .tools import axis_label, edges_to_centers, get_color, lttb_indices
 
 # Other imports
 import numpy as np
@@ -15,7 +15,7 @@ import ipywidgets as widgets
 
 
 def plot_1d(input_data, backend=None, logx=False, logy=False, logxy=False,
-            color=None, filename=None, axes=None):
+            color=None, filename=None, axes=None, downsample=True):
     """
     Plot a 1D spectrum.
 
@@ -23,6 +23,12 @@ def plot_1d(input_data, backend=None, logx=False, logy=False, logxy=False,
     If the coordinate of the x-axis contains bin edges, then a bar plot is
     made.
     If the data contains more than one dimensions, sliders are added.
+    If downsample is True, traces longer than config.max_points_per_trace
+    are downsampled before being sent to the figure. When zooming in, the
+    visible range is downsampled again from the full data. Figures saved to
+    an html file are never downsampled, but figures saved to an image or
+    displayed with the static backend are, and then do not contain all the
+    data points.
 
     TODO: find a more general way of handling arguments to be sent to plotly,
     probably via a dictionay of arguments
@@ -31,17 +37,16 @@ def plot_1d(input_data, backend=None, logx=False, logy=False, logxy=False,
     ymin = 1.0e30
     ymax = -1.0e30
 
+    # Sort the entries once, and use the same order in the Slicer1d
+    items = sorted(input_data)
+
     data = []
-    for i, (name, var) in enumerate(sorted(input_data)):
+    for i, (name, var) in enumerate(items):
 
         ax = var.dims
-        if var.variances is not None:
-            err = np.sqrt(var.variances)
-        else:
-            err = 0.0
-
-        ymin = min(ymin, np.nanmin(var.values - err))
-        ymax = max(ymax, np.nanmax(var.values + err))
+        vmin, vmax = get_value_range(var)
+        ymin = min(ymin, vmin)
+        ymax = max(ymax, vmax)
 
         # Define trace
         trace = dict(name=name, type="scattergl")
@@ -68,31 +73,82 @@ def plot_1d(input_data, backend=None, logx=False, logy=False, logxy=False,
     dy = 0.05*(ymax - ymin)
     layout["yaxis"]["range"] = [ymin-dy, ymax+dy]
 
-    sv = Slicer1d(data=data, layout=layout, input_data=input_data, axes=axes,
-                  color=color)
+    # An html file cannot resample the data when zooming in
+    if filename is not None and filename.endswith(".html"):
+        downsample = False
+
+    sv = Slicer1d(data=data, layout=layout, input_data=input_data,
+                  items=items, axes=axes, color=color, downsample=downsample)
     render_plot(static_fig=sv.fig, interactive_fig=sv.box, backend=backend,
                 filename=filename)
 
     return
 
 
+def get_value_range(var):
+    """
+    Find the range spanned by the values of a variable, including the error
+    bars if variances are present. A single work buffer is used for the
+    values shifted by the errors.
+    """
+    values = var.values
+    if var.variances is None:
+        return np.nanmin(values), np.nanmax(values)
+    err = np.sqrt(var.variances)
+    buf = np.subtract(values, err)
+    vmin = np.nanmin(buf)
+    np.add(values, err, out=buf)
+    vmax = np.nanmax(buf)
+    return vmin, vmax
+
+
 class Slicer1d(Slicer):
 
-    def __init__(self, data, layout, input_data, axes, color):
+    def __init__(self, data, layout, input_data, items, axes, color,
+                 downsample):
 
         super().__init__(input_data=input_data, axes=axes,
                          button_options=['X'])
 
         self.color = color
-        self.fig = go.FigureWidget(layout=layout)
-
+        self.downsample = downsample
+
+        # The (name, var) pairs of the data, in the order of the traces
+        self._items = items
+        self._active_sliders = []
+        # The bin centers of histogrammed dimensions, computed once per
+        # dimension since the coordinates do not change
+        self._centers = dict()
+        self._histogram = False
+        # The x axis titles, for each slider dimension
+        self._axis_labels = dict()
+        # The index in fig.data of each kept trace, by keep button id
+        self._kept_traces = dict()
+        # The x coordinates of the traces, whether they are downsampled, and
+        # the visible x range to be downsampled separately when zoomed in
+        self._x = None
+        self._downsampled = False
+        self._xrange = None
+        # The values and variances are sliced with a numpy index built from
+        # the active sliders, instead of slicing the scipp variables. The
+        # numpy views are fetched only once.
+        self._dims = dict()
+        self._values = dict()
+        self._variances = dict()
+        for name, var in self._items:
+            self._dims[name] = var.dims
+            self._values[name] = var.values
+            self._variances[name] = var.variances
+
+        # The traces prepared by plot_1d are all added when the figure is
+        # created, instead of validating and sending them one by one
         self.traces = dict()
-        for i, (name, var) in enumerate(sorted(self.input_data)):
-            trace = dict(name=name, type="scattergl")
-            if color is not None:
-                trace["marker"] = {"color": color[i]}
+        for i, (name, var) in enumerate(self._items):
             self.traces[name] = i
-            self.fig.add_trace(trace)
+        self.fig = go.FigureWidget(data=data, layout=layout)
+        if self.downsample:
+            self.fig.layout.xaxis.on_change(self.update_xrange, "range",
+                                            "autorange")
 
         # Disable buttons
         for key, button in self.buttons.items():
@@ -103,15 +159,18 @@ class Slicer1d(Slicer):
         self.update_histograms()
 
         self.keep_buttons = dict()
+        # The rows of keep buttons, created once per button
+        self.keep_hboxes = dict()
+        # Kept traces cycle through the default colors, skipping the colors
+        # of the main traces
+        self._keep_color_index = 0
+        self._main_colors = set()
+        if self.color is not None:
+            self._main_colors = {str(col).lower() for col in self.color}
         if self.ndim > 1:
             self.make_keep_button()
 
-        # vbox contains the original sliders and buttons. In mbox, we include
-        # the keep trace buttons.
-        self.mbox = [self.fig] + self.vbox
-        for key, val in self.keep_buttons.items():
-            self.mbox.append(widgets.HBox(val))
-        self.box = widgets.VBox(self.mbox)
+        self.box = widgets.VBox(self.box_children())
         self.box.layout.align_items = 'center'
 
         return
@@ -121,11 +180,9 @@ class Slicer1d(Slicer):
                                 layout={'width': 'initial'})
         but = widgets.Button(description="Keep", disabled=False,
                              button_style="", layout={'width': "70px"})
-        # Generate a random color. TODO: should we initialise the seed?
         col = widgets.ColorPicker(
             concise=True, description='',
-            value='#%02X%02X%02X' % (tuple(np.random.randint(0, 255, 3))),
-            disabled=False)
+            value=self.next_keep_color(), disabled=False)
         # Make a unique id
         key = str(id(but))
         setattr(but, "id", key)
@@ -133,8 +190,24 @@ class Slicer1d(Slicer):
         but.on_click(self.keep_remove_trace)
         col.observe(self.update_trace_color, names="value")
         self.keep_buttons[key] = [drop, but, col]
+        self.keep_hboxes[key] = widgets.HBox(self.keep_buttons[key])
         return
 
+    def next_keep_color(self):
+        # If all the default colors are used by the main traces, they are
+        # used again for the kept traces
+        for i in range(len(config.color_list)):
+            col = get_color(index=self._keep_color_index)
+            self._keep_color_index += 1
+            if col.lower() not in self._main_colors:
+                break
+        return col
+
+    def box_children(self):
+        # vbox contains the original sliders and buttons. After these come
+        # the rows of keep trace buttons.
+        return tuple([self.fig] + self.vbox + list(self.keep_hboxes.values()))
+
     def update_buttons(self, owner, event, dummy):
         for key, button in self.buttons.items():
             if key == owner.dim_str:
@@ -144,54 +217,130 @@ class Slicer1d(Slicer):
                 self.slider[key].disabled = False
                 button.value = None
                 button.disabled = False
-        self.update_axes(owner.dim_str)
-        self.update_slice(None)
-        self.update_histograms()
-
-        self.keep_buttons = dict()
-        self.make_keep_button()
-        self.mbox = [self.fig] + self.vbox
-        for k, b in self.keep_buttons.items():
-            self.mbox.append(widgets.HBox(b))
-        self.box.children = tuple(self.mbox)
+        with self.fig.batch_update():
+            self.update_axes(owner.dim_str)
+            self.update_slice(None)
+            self.update_histograms()
+
+        # The kept traces have been removed by the change of axes, so their
+        # buttons are removed too. The pending Keep button is left untouched,
+        # and the widget tree is only modified if there was a kept trace.
+        kept = [key for key, val in self.keep_buttons.items()
+                if val[1].description == "Remove"]
+        if len(kept) > 0:
+            for key in kept:
+                del self.keep_buttons[key]
+                del self.keep_hboxes[key]
+            self.box.children = self.box_children()
         return
 
     def update_axes(self, dim_str):
-        self.fig.data = self.fig.data[:len(self.input_data)]
-        self.fig.update_traces(x=self.slider_x[dim_str].values)
-        self.fig.layout["xaxis"]["title"] = axis_label(
-            self.slider_x[dim_str], name=self.slider_labels[dim_str])
+        # Kept traces belong to the previous axis and are dropped. The main
+        # traces are left in place and only their x coordinates are updated,
+        # to avoid re-creating the whole figure in the front-end.
+        ntraces = len(self.input_data)
+        if len(self.fig.data) > ntraces:
+            self.fig.data = self.fig.data[:ntraces]
+            self._kept_traces.clear()
+        # The set of active sliders only changes along with the axes
+        self._active_sliders = [(key, val) for key, val in self.slider.items()
+                                if not val.disabled]
+        x = self.slider_x[dim_str].values
+        # Histograms are drawn at the bin centers
+        self._histogram = len(x) == self.slider_nx[dim_str] + 1
+        if self._histogram:
+            if dim_str not in self._centers:
+                self._centers[dim_str] = edges_to_centers(x)
+            x = self._centers[dim_str]
+        self._x = x
+        self._xrange = None
+        # Downsampled traces have their x coordinates set in update_slice
+        self._downsampled = self.downsample and (
+            len(x) > config.max_points_per_trace)
+        with self.fig.batch_update():
+            if not self._downsampled:
+                for trace in self.fig.data:
+                    trace.x = x
+            if dim_str not in self._axis_labels:
+                self._axis_labels[dim_str] = axis_label(
+                    self.slider_x[dim_str], name=self.slider_labels[dim_str])
+            self.fig.layout["xaxis"]["title"] = self._axis_labels[dim_str]
         return
 
     # Define function to update slices
     def update_slice(self, change):
         # The dimensions to be sliced have been saved in slider_dims
-        for i, (name, var) in enumerate(sorted(self.input_data)):
-            vslice = var
-            # Slice along dimensions with active sliders
-            for key, val in self.slider.items():
-                if not val.disabled:
-                    if i == 0:
-                        self.lab[key].value = self.make_slider_label(
-                            self.slider_x[key], val.value)
-                    vslice = vslice[val.dim, val.value]
-            self.fig.data[i].y = vslice.values
-            if var.variances is not None:
-                self.fig.data[i]["error_y"].array = np.sqrt(vslice.variances)
+        for key, val in self._active_sliders:
+            self.lab[key].value = self.make_slider_label(
+                self.slider_x[key], val.value)
+        positions = {val.dim: val.value for key, val in self._active_sliders}
+        # All trace updates are collected into a single message to the
+        # front-end.
+        with self.fig.batch_update():
+            for i, (name, var) in enumerate(self._items):
+                # Slice along dimensions with active sliders
+                index = tuple(positions.get(dim, slice(None))
+                              for dim in self._dims[name])
+                y = self._values[name][index]
+                variances = self._variances[name]
+                if variances is not None:
+                    variances = variances[index]
+                # Only send a subset of the points of long traces, the raw
+                # data is kept to be sliced again on the next update
+                if self._downsampled:
+                    ind = self.downsample_indices(y)
+                    self.fig.data[i].x = self._x[ind]
+                    y = y[ind]
+                    if variances is not None:
+                        variances = variances[ind]
+                self.fig.data[i].y = y
+                if variances is not None:
+                    self.fig.data[i]["error_y"].array = np.sqrt(variances)
+        return
+
+    def downsample_indices(self, y):
+        """
+        Select the points of a trace to be sent to the figure. The whole
+        trace is downsampled, and when zoomed in, the points in the visible
+        range are added, downsampled separately.
+        """
+        ind = lttb_indices(self._x, y, 2 * config.width)
+        if self._xrange is not None:
+            inside = np.flatnonzero((self._x >= self._xrange[0]) &
+                                    (self._x <= self._xrange[1]))
+            if len(inside) > 0:
+                # Include one point on each side so that the lines reach the
+                # edges of the figure
+                start = max(inside[0] - 1, 0)
+                end = min(inside[-1] + 2, len(self._x))
+                visible = start + lttb_indices(self._x[start:end],
+                                               y[start:end], 2 * config.width)
+                ind = np.union1d(ind, visible)
+        return ind
+
+    def update_xrange(self, xaxis, xrange, autorange):
+        if autorange or xrange is None:
+            xrange = None
+        else:
+            xrange = np.sort(xrange)
+            if xaxis.type == "log":
+                xrange = 10.0**xrange
+        self._xrange = xrange
+        if self._downsampled:
+            self.update_slice(None)
         return
 
     def update_histograms(self):
-        for i in range(len(self.fig.data)):
-            trace = self.fig.data[i]
-            if len(trace.x) == len(trace.y) + 1:
-                trace["line"] = {"shape": "hvh"}
-                trace["x"] = 0.5 * (trace["x"][:-1] + trace["x"][1:])
-                trace["fill"] = "tozeroy"
-                trace["mode"] = "lines"
-            else:
-                trace["line"] = None
-                trace["fill"] = None
-                trace["mode"] = None
+        with self.fig.batch_update():
+            for trace in self.fig.data:
+                if self._histogram:
+                    trace["line"] = {"shape": "hvh"}
+                    trace["fill"] = "tozeroy"
+                    trace["mode"] = "lines"
+                else:
+                    trace["line"] = None
+                    trace["fill"] = None
+                    trace["mode"] = None
         return
 
     def keep_remove_trace(self, owner):
@@ -204,38 +353,40 @@ class Slicer1d(Slicer):
     def keep_trace(self, owner):
         lab = self.keep_buttons[owner.id][0].value
         self.fig.add_trace(self.fig.data[self.traces[lab]])
-        self.fig.data[-1]["marker"]["color"] = self.keep_buttons[
-            owner.id][2].value
-        self.fig.data[-1]["showlegend"] = False
-        self.fig.data[-1]["meta"] = owner.id
+        with self.fig.batch_update():
+            self.fig.data[-1]["marker"]["color"] = self.keep_buttons[
+                owner.id][2].value
+            self.fig.data[-1]["showlegend"] = False
+            self.fig.data[-1]["meta"] = owner.id
+        self._kept_traces[owner.id] = len(self.fig.data) - 1
         for key, val in self.slider.items():
             if not val.disabled:
                 lab = "{},{}:{}".format(lab, key, val.value)
         self.keep_buttons[owner.id][0] = widgets.Label(
             value=lab, layout={'width': "initial"}, title=lab)
+        # Only the dropdown of the existing row is replaced by the label
+        self.keep_hboxes[owner.id].children = tuple(
+            self.keep_buttons[owner.id])
         self.make_keep_button()
         owner.description = "Remove"
-        self.mbox = [self.fig] + self.vbox
-        for k, b in self.keep_buttons.items():
-            self.mbox.append(widgets.HBox(b))
-        self.box.children = tuple(self.mbox)
+        self.box.children = self.box_children()
         return
 
     def remove_trace(self, owner):
         del self.keep_buttons[owner.id]
-        data = []
-        for tr in self.fig.data:
-            if tr.meta != owner.id:
-                data.append(tr)
-        self.fig.data = data
-        self.mbox = [self.fig] + self.vbox
-        for k, b in self.keep_buttons.items():
-            self.mbox.append(widgets.HBox(b))
-        self.box.children = tuple(self.mbox)
+        index = self._kept_traces.pop(owner.id)
+        self.fig.data = self.fig.data[:index] + self.fig.data[index + 1:]
+        # Shift the indices of the traces that were kept after this one
+        for key, ind in self._kept_traces.items():
+            if ind > index:
+                self._kept_traces[key] = ind - 1
+        del self.keep_hboxes[owner.id]
+        self.box.children = self.box_children()
         return
 
     def update_trace_color(self, change):
-        for tr in self.fig.data:
-            if tr.meta == change["owner"].id:
-                tr["marker"]["color"] = change["new"]
-                return
+        key = change["owner"].id
+        if key in self._kept_traces:
+            self.fig.data[self._kept_traces[key]]["marker"]["color"] = \
+                change["new"]
+        return
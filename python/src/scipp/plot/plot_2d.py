@@ -6,7 +6,7 @@
 from ..config import plot as config
 from .render import render_plot
 from .slicer import Slicer
-from .tools import axis_label, parse_colorbar
+from .tools import axis_label, parse_colorbar, get_finite_range
 
 
 # Other imports
@@ -144,14 +144,8 @@ class Slicer2d(Slicer):
         for i, (key, val) in enumerate(sorted(params.items())):
             if val is not None:
                 arr = getattr(self.input_data, key)
-                if self.cb[val["cbmin"]] is not None:
-                    vmin = self.cb[val["cbmin"]]
-                else:
-                    vmin = np.amin(arr[np.where(np.isfinite(arr))])
-                if self.cb[val["cbmax"]] is not None:
-                    vmax = self.cb[val["cbmax"]]
-                else:
-                    vmax = np.amax(arr[np.where(np.isfinite(arr))])
+                vmin, vmax = get_finite_range(arr, vmin=self.cb[val["cbmin"]],
+                                              vmax=self.cb[val["cbmax"]])
 
                 if rasterize:
                     self.scalarMap[i] = cm.ScalarMappable(
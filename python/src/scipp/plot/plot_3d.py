@@ -7,7 +7,7 @@ from ..config import plot as config
 from .plot_2d import Slicer2d
 from .render import render_plot
 from .slicer import Slicer
-from .tools import axis_label, parse_colorbar
+from .tools import axis_label, parse_colorbar, get_finite_range
 from .._scipp import core as sc
 
 
@@ -97,14 +97,9 @@ class Slicer3d(Slicer):
         for i, (key, val) in enumerate(sorted(params.items())):
             if val is not None:
                 arr = getattr(self.input_data, key)
-                if self.cb[val["cbmin"]] is not None:
-                    val["cmin"] = self.cb[val["cbmin"]]
-                else:
-                    val["cmin"] = np.amin(arr[np.where(np.isfinite(arr))])
-                if self.cb[val["cbmax"]] is not None:
-                    val["cmax"] = self.cb[val["cbmax"]]
-                else:
-                    val["cmax"] = np.amax(arr[np.where(np.isfinite(arr))])
+                val["cmin"], val["cmax"] = get_finite_range(
+                    arr, vmin=self.cb[val["cbmin"]],
+                    vmax=self.cb[val["cbmax"]])
 
         colorbars = [{"x": 1.0, "title": value_name,
                       "thicknessmode": 'fraction', "thickness": 0.02}]
@@ -6,7 +6,7 @@
 # Scipp imports
 from .sparse import visit_sparse_data
 from .tools import edges_to_centers, centers_to_edges, axis_label, \
-                   parse_colorbar, axis_to_dim_label
+                   parse_colorbar, axis_to_dim_label, get_finite_range
 
 # Other imports
 import numpy as np
@@ -34,19 +34,25 @@ def plot_1d(input_data, logx=False, logy=False, logxy=False,
     if axes is None:
         axes = input_data.dims
 
-    for i, (name, var) in enumerate(input_data):
+    # All entries share the same x coordinate, so the axis, the labels and
+    # the bin edges are only looked up once
+    dim, lab, xcoord = axis_to_dim_label(input_data, axes[-1])
+    x = xcoord.values
+    xlab = axis_label(var=xcoord, name=lab)
+    # Sort the entries to match the order in which the colors were assigned
+    items = sorted(input_data)
+    ylab = axis_label(var=items[-1][1], name="")
 
-        dim, lab, xcoord = axis_to_dim_label(var, axes[-1])
-        x = xcoord.values
-        xlab = axis_label(var=xcoord, name=lab)
-        y = var.values
-        ylab = axis_label(var=var, name="")
+    # Check for bin edges
+    histogram = x.shape[0] == items[0][1].shape[0] + 1
+    if histogram:
+        xe = x.copy()
+        x = edges_to_centers(x)
 
-        # Check for bin edges
-        if x.shape[0] == y.shape[0] + 1:
-            xe = x.copy()
+    for i, (name, var) in enumerate(items):
+        y = var.values
+        if histogram:
             ye = np.concatenate(([0], y))
-            x = edges_to_centers(x)
             out["fill_between"][name] = ax.fill_between(
                 xe, ye, step="pre", alpha=0.6, label=name, color=color[i])
             out["step"][name] = ax.step(xe, ye, color=color[i])
@@ -156,20 +162,16 @@ def plot_2d(input_data, name=None, axes=None, contours=False, cb=None,
     for i, (key, param) in enumerate(sorted(params.items())):
         # if param is not None:
         arr = getattr(var, key)
-        if cbar["log"]:
-            with np.errstate(invalid="ignore", divide="ignore"):
-                arr = np.log10(arr)
-        if cbar[param["cbmin"]] is not None:
-            vmin = cbar[param["cbmin"]]
-        else:
-            vmin = np.amin(arr[np.where(np.isfinite(arr))])
-        if cbar[param["cbmax"]] is not None:
-            vmax = cbar[param["cbmax"]]
-        else:
-            vmax = np.amax(arr[np.where(np.isfinite(arr))])
-
+        # The transpose is only a view. When taking the logarithm, the result
+        # is written in C order, so that the image does not need to be copied
+        # again into a contiguous layout.
         if transpose:
             arr = arr.T
+        if cbar["log"]:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                arr = np.log10(arr, order="C")
+        vmin, vmax = get_finite_range(arr, vmin=cbar[param["cbmin"]],
+                                      vmax=cbar[param["cbmax"]])
 
         args = {"vmin": vmin, "vmax": vmax, "cmap": cbar["name"]}
         if contours:
@@ -2,6 +2,7 @@
 # Copyright (c) 2019 Scipp contributors (https://github.com/scipp)
 # @author Neil Vaytet
 
+from ..config import plot as config
 from .tools import axis_to_dim_label
 from .._scipp.core.units import dimensionless
 
@@ -81,7 +82,7 @@ class Slicer:
                 max=self.slider_nx[key] - 1,
                 step=1,
                 description=descr,
-                continuous_update=True,
+                continuous_update=config.continuous_update,
                 readout=False,
                 disabled=((i >= self.ndim-len(button_options)) and
                           ((len(button_options) < 3) or volume)))
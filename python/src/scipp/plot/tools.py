@@ -33,6 +33,71 @@ def centers_to_edges(x):
     return np.concatenate([[2.0 * x[0] - e[0]], e, [2.0 * x[-1] - e[-1]]])
 
 
+def lttb_indices(x, y, npoints):
+    """
+    Select the indices of npoints points which preserve the visual shape of
+    the curve (x, y), using the Largest-Triangle-Three-Buckets algorithm.
+    The first and last points are always kept. To process all the buckets at
+    once, the triangles use the averages of the previous and next buckets as
+    vertices, instead of the point selected in the previous bucket.
+    Non-finite values of y are only selected if a bucket has no other points.
+    """
+    n = len(x)
+    if npoints >= n or npoints < 3:
+        return np.arange(n)
+    # The points between the first and the last are split into buckets, and
+    # one point is selected from each bucket
+    edges = np.linspace(1, n - 1, npoints - 1).astype(np.int64)
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    # Bucket averages, ignoring the non-finite values of y
+    finite = np.isfinite(y[:-1])
+    xavg = np.add.reduceat(x[:-1], starts) / sizes
+    ysum = np.add.reduceat(np.where(finite, y[:-1], 0.0), starts)
+    count = np.add.reduceat(finite.astype(np.int64), starts)
+    yavg = np.divide(ysum, count, out=np.full(len(starts), np.nan),
+                     where=count > 0)
+    # The outer vertices of the triangles, using the first and last points
+    # for the first and last buckets
+    xl = np.concatenate([x[:1], xavg[:-1]])
+    yl = np.concatenate([y[:1], yavg[:-1]])
+    xr = np.concatenate([xavg[1:], x[-1:]])
+    yr = np.concatenate([yavg[1:], y[-1:]])
+    # Indices of the points in each bucket, with the shorter buckets padded
+    # by repeating their last point
+    cols = np.minimum(starts[:, None] + np.arange(sizes.max()),
+                      (edges[1:] - 1)[:, None])
+    ycols = y[cols]
+    area = np.abs((xl - xr)[:, None] * (ycols - yl[:, None]) -
+                  (xl[:, None] - x[cols]) * (yr - yl)[:, None])
+    # A bucket next to one with no finite values has no finite areas, but
+    # its finite points are still preferred over the non-finite ones
+    area[~np.isfinite(area)] = 0.0
+    area[~np.isfinite(ycols)] = -1.0
+    ind = np.empty(npoints, dtype=np.int64)
+    ind[0] = 0
+    ind[-1] = n - 1
+    ind[1:-1] = cols[np.arange(len(starts)), np.argmax(area, axis=1)]
+    return ind
+
+
+def get_finite_range(array, vmin=None, vmax=None):
+    """
+    Find the minimum and maximum of the finite values in an array. Limits that
+    are supplied are returned unchanged. A copy of the finite values is only
+    made if the array contains non-finite values.
+    """
+    if vmin is None or vmax is None:
+        finite = np.isfinite(array)
+        if not finite.all():
+            array = array[finite]
+        if vmin is None:
+            vmin = np.amin(array)
+        if vmax is None:
+            vmax = np.amax(array)
+    return vmin, vmax
+
+
 def axis_label(var=None, name=None, log=False, replace_dim=True):
     """
     Make an axis label with "Name [unit]"
@@ -6,8 +6,12 @@ import scipp as sc
 import numpy as np
 import io
 from contextlib import redirect_stdout
+from types import SimpleNamespace
 from itertools import product
 import pytest
+import ipywidgets as widgets
+from scipp.plot.plot_1d import Slicer1d
+from scipp.plot.tools import get_color, lttb_indices
 
 # TODO: For now we are just checking that the plot does not throw any errors.
 # In the future it would be nice to check the output by either comparing
@@ -144,6 +148,102 @@ def test_plot_1d_bin_edges_with_variances():
     do_plot(d, test_mpl_backend=True)
 
 
+def make_long_dataset():
+    N = sc.config.plot.max_points_per_trace + 1
+    d = sc.Dataset()
+    d.coords[sc.Dim.Tof] = sc.Variable(
+        [sc.Dim.Tof], values=np.arange(N + 1).astype(np.float64))
+    d["Sample"] = sc.Variable([sc.Dim.Tof], values=np.random.rand(N),
+                              variances=np.random.rand(N))
+    return d
+
+
+def capture_figures(monkeypatch):
+    figures = []
+
+    def render_plot(static_fig=None, **kwargs):
+        figures.append(static_fig)
+
+    monkeypatch.setattr("scipp.plot.plot_1d.render_plot", render_plot)
+    return figures
+
+
+def test_plot_1d_downsampled(monkeypatch):
+    figures = capture_figures(monkeypatch)
+    d = make_long_dataset()
+    N = d["Sample"].shape[0]
+    sc.plot.plot(d)
+    sc.plot.plot(d, downsample=False)
+    sc.plot.plot(d, filename="downsampled.html")
+    npoints = 2 * sc.config.plot.width
+    assert len(figures[0].data[0].x) == npoints
+    assert len(figures[0].data[0].y) == npoints
+    assert len(figures[0].data[0].error_y.array) == npoints
+    assert len(figures[1].data[0].x) == N
+    # Figures saved to html are never downsampled
+    assert len(figures[2].data[0].x) == N
+
+
+def test_plot_1d_downsampled_zoom(monkeypatch):
+    figures = capture_figures(monkeypatch)
+    d = make_long_dataset()
+    sc.plot.plot(d)
+    fig = figures[0]
+    npoints = 2 * sc.config.plot.width
+    # All the points in a narrow visible range are sent, on top of the
+    # downsampled trace
+    fig.layout.xaxis.range = [1000.0, 1100.0]
+    x = np.array(fig.data[0].x)
+    assert len(x) > npoints
+    assert np.all(np.isin(np.arange(1000, 1101) + 0.5, x))
+    assert len(fig.data[0].y) == len(x)
+    assert len(fig.data[0].error_y.array) == len(x)
+    fig.layout.xaxis.autorange = True
+    assert len(fig.data[0].x) == npoints
+
+
+def test_lttb_indices():
+    n = 1000
+    x = np.arange(n, dtype=np.float64)
+    y = np.random.rand(n)
+    for npoints in [3, 10, 100, 999]:
+        ind = lttb_indices(x, y, npoints)
+        assert len(ind) == npoints
+        assert ind[0] == 0
+        assert ind[-1] == n - 1
+        assert np.all(np.diff(ind) > 0)
+
+
+def test_lttb_indices_no_downsampling():
+    x = np.arange(10, dtype=np.float64)
+    y = np.random.rand(10)
+    assert np.array_equal(lttb_indices(x, y, 10), np.arange(10))
+    assert np.array_equal(lttb_indices(x, y, 20), np.arange(10))
+
+
+def test_lttb_indices_keeps_peak():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[567] = 10.0
+    assert 567 in lttb_indices(x, y, 50)
+
+
+def test_lttb_indices_with_nan():
+    n = 1000
+    x = np.arange(n, dtype=np.float64)
+    y = np.random.rand(n)
+    y[::3] = np.nan
+    y[500:600] = np.nan
+    ind = lttb_indices(x, y, 100)
+    assert len(ind) == 100
+    assert ind[0] == 0
+    assert ind[-1] == n - 1
+    assert np.all(np.diff(ind) > 0)
+    # NaN values are only selected in buckets which contain nothing else
+    selected = ind[1:-1][np.isnan(y[ind[1:-1]])]
+    assert np.all((selected >= 500) & (selected < 600))
+
+
 def test_plot_1d_two_entries():
     d = make_dense_dataset(ndim=1)
     d["Background"] = sc.Variable([sc.Dim.Tof],
@@ -171,6 +271,69 @@ def test_plot_1d_three_entries_with_labels():
             test_mpl_backend=True)
 
 
+def make_slicer_1d(d, color):
+    items = sorted(d)
+    data = [dict(name=name, type="scattergl") for name, var in items]
+    return Slicer1d(data=data, layout=dict(), input_data=d, items=items,
+                    axes=items[-1][1].dims, color=color, downsample=False)
+
+
+def test_plot_1d_keep_colors_differ_from_main_traces():
+    d = make_dense_dataset(ndim=2)
+    sv = make_slicer_1d(d, color=[get_color(index=2)])
+    sv.make_keep_button()
+    sv.make_keep_button()
+    colors = [val[2].value for val in sv.keep_buttons.values()]
+    assert colors == [get_color(index=0), get_color(index=1),
+                      get_color(index=3)]
+
+
+def test_plot_1d_keep_and_remove_traces():
+    d = make_dense_dataset(ndim=2)
+    sv = make_slicer_1d(d, color=[get_color(index=0)])
+    keys = []
+    for i in range(3):
+        # The last row holds the pending Keep button
+        key = list(sv.keep_hboxes.keys())[-1]
+        hbox = sv.keep_hboxes[key]
+        # The button itself is the owner, since a change of axes finds the
+        # kept rows from the descriptions of their buttons
+        sv.keep_trace(sv.keep_buttons[key][1])
+        # The row is reused, with the dropdown replaced by a label
+        assert sv.keep_hboxes[key] is hbox
+        assert isinstance(hbox.children[0], widgets.Label)
+        keys.append(key)
+    colors = [sv.keep_buttons[key][2].value for key in keys]
+    assert len(sv.fig.data) == 4
+    for i, key in enumerate(keys):
+        assert sv.fig.data[i + 1].meta == key
+        assert sv.fig.data[i + 1].marker.color == colors[i]
+    assert len(sv.keep_hboxes) == 4
+    assert sv.box.children[-4:] == tuple(sv.keep_hboxes.values())
+
+    # Removing the middle trace shifts the index of the last one
+    sv.remove_trace(SimpleNamespace(id=keys[1], description="Remove"))
+    assert len(sv.fig.data) == 3
+    assert sv.fig.data[1].meta == keys[0]
+    assert sv.fig.data[2].meta == keys[2]
+    assert keys[1] not in sv.keep_hboxes
+    assert len(sv.box.children) == 1 + len(sv.vbox) + 3
+    assert sv.box.children[-3:] == tuple(sv.keep_hboxes.values())
+
+    # Changing the color of the last button only recolors the last trace
+    sv.update_trace_color({"owner": SimpleNamespace(id=keys[2]),
+                           "new": "#000000"})
+    assert sv.fig.data[2].marker.color == "#000000"
+    assert sv.fig.data[1].marker.color == colors[0]
+
+    # A change of axes drops the kept traces and their rows
+    sv.update_buttons(sv.buttons[str(sc.Dim.Tof)], None, None)
+    assert len(sv.fig.data) == 1
+    assert sv._kept_traces == {}
+    assert len(sv.keep_hboxes) == 1
+    assert len(sv.box.children) == 1 + len(sv.vbox) + 1
+
+
 def test_plot_2d_image():
     d = make_dense_dataset(ndim=2)
     do_plot(d, test_mpl_backend=True)